@@ -21,6 +21,10 @@ from collections import defaultdict
 from datetime import datetime
 from typing import Any
 
+# Standard ANSI escape sequence pattern
+# Matches: ESC [ <parameters> <command>
+_ANSI_ESCAPE_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
 
 def strip_ansi_codes(text: str) -> str:
     """Remove ANSI escape sequences from text.
@@ -34,10 +38,7 @@ def strip_ansi_codes(text: str) -> str:
     Returns:
         Text with all ANSI escape sequences removed
     """
-    # Standard ANSI escape sequence pattern
-    # Matches: ESC [ <parameters> <command>
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+    return _ANSI_ESCAPE_RE.sub('', text)
 
 
 def load_evaluation_results(json_file: str) -> list[dict[str, Any]]:
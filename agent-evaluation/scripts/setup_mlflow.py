@@ -12,7 +12,12 @@ Features:
 """
 
 import argparse
+import contextlib
+import functools
+import importlib.metadata
+import json
 import os
+import shutil
 import subprocess
 import sys
 
@@ -31,50 +36,111 @@ def parse_arguments():
     parser.add_argument(
         "--create", action="store_true", help="Create new experiment with --experiment-name"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--emit",
+        choices=["shell", "json", "dotenv"],
+        default="shell",
+        help="Output format: shell export lines (default), a JSON object on stdout, "
+        "or KEY=VALUE lines appended to --env-file / $GITHUB_ENV",
+    )
+    parser.add_argument(
+        "--env-file", help="File to append KEY=VALUE lines to with --emit dotenv"
+    )
+    args = parser.parse_args()
+
+    # Validate output options up front, before any experiment is created
+    if args.env_file and args.emit != "dotenv":
+        parser.error("--env-file can only be used with --emit dotenv")
+    if args.emit == "dotenv":
+        args.env_file = args.env_file or os.getenv("GITHUB_ENV")
+        if not args.env_file:
+            parser.error("--emit dotenv requires --env-file or $GITHUB_ENV")
+
+    return args
 
 
 def check_mlflow_installed() -> bool:
     """Check if MLflow >=3.6.0 is installed."""
-    try:
-        import mlflow
+    # Read the installed version from package metadata; importing mlflow itself
+    # is slow and only needed once we actually talk to the tracking server.
+    # mlflow-skinny (common on Databricks) also provides the mlflow package.
+    for dist in ("mlflow", "mlflow-skinny"):
+        try:
+            version = importlib.metadata.version(dist)
+            print(f"✓ MLflow {version} is installed")
+            return True
+        except importlib.metadata.PackageNotFoundError:
+            pass
 
-        version = mlflow.__version__
-        print(f"✓ MLflow {version} is installed")
-        return True
-    except ImportError:
-        print("✗ MLflow is not installed")
-        print("  Install with: uv pip install mlflow")
-        return False
+    print("✗ MLflow is not installed")
+    print("  Install with: uv pip install mlflow")
+    return False
 
 
-def detect_databricks_profiles() -> list[str]:
-    """Detect available and valid Databricks profiles.
+def _parse_profiles_table(stdout: str) -> list[str]:
+    """Parse the human-readable `databricks auth profiles` table (older CLIs).
 
     Returns:
         List of profile names that have Valid=YES
     """
+    lines = stdout.strip().split("\n")
+    # Skip header line: "Name        Host                      Valid"
+    profiles = []
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+        # Parse columns: Name, Host, Valid
+        parts = line.split()
+        if len(parts) >= 3:
+            name = parts[0]
+            valid = parts[-1]  # Last column is Valid (YES/NO)
+            if valid.upper() == "YES":
+                profiles.append(name)
+    return profiles
+
+
+@functools.lru_cache(maxsize=1)
+def detect_databricks_profiles() -> list[str] | None:
+    """Detect available and valid Databricks profiles.
+
+    Returns:
+        List of profile names that have Valid=YES, or None if the CLI timed out
+        (profiles may exist, so callers must not treat this as "none found")
+    """
+    # Avoid spawning a subprocess at all on hosts without the Databricks CLI
+    if shutil.which("databricks") is None:
+        return []
+
     try:
         result = subprocess.run(
-            ["databricks", "auth", "profiles"], capture_output=True, text=True, check=True
+            ["databricks", "auth", "profiles", "--output", "json"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5,
         )
-        lines = result.stdout.strip().split("\n")
-        # Skip header line: "Name        Host                      Valid"
-        profiles = []
-        for line in lines[1:]:
-            if not line.strip():
-                continue
-            # Parse columns: Name, Host, Valid
-            parts = line.split()
-            if len(parts) >= 3:
-                name = parts[0]
-                valid = parts[-1]  # Last column is Valid (YES/NO)
-                if valid.upper() == "YES":
-                    profiles.append(name)
-        return profiles
+    except subprocess.TimeoutExpired:
+        # The CLI validates every profile over the network, so one stale profile
+        # can be slow even when a valid DEFAULT profile exists
+        print("✗ `databricks auth profiles` timed out after 5s")
+        print("  Pass --tracking-uri databricks://<profile> explicitly")
+        return None
     except (subprocess.CalledProcessError, FileNotFoundError):
         return []
 
+    try:
+        data = json.loads(result.stdout)
+    except json.JSONDecodeError:
+        return _parse_profiles_table(result.stdout)
+
+    # An empty profile list is rendered as {"profiles": null}
+    profiles = (data.get("profiles") if isinstance(data, dict) else None) or []
+    return [
+        p["name"]
+        for p in profiles
+        if isinstance(p, dict) and p.get("name") and p.get("valid")
+    ]
+
 
 def auto_detect_tracking_uri() -> str:
     """Auto-detect best tracking URI.
@@ -93,6 +159,9 @@ def auto_detect_tracking_uri() -> str:
 
     # Priority 2: Try DEFAULT Databricks profile
     profiles = detect_databricks_profiles()
+    if profiles is None:
+        # Detection timed out; don't silently fall back to local SQLite
+        sys.exit(1)
     if profiles:
         # Look for DEFAULT profile
         if "DEFAULT" in profiles:
@@ -136,26 +205,70 @@ def configure_tracking_uri(args_uri: str | None = None) -> str:
     return auto_detect_tracking_uri()
 
 
-def list_experiments(tracking_uri: str, max_results: int = 100) -> list[dict]:
+@functools.lru_cache(maxsize=1)
+def _get_client(tracking_uri: str):
+    """Get an MlflowClient bound to tracking_uri, shared across lookups and creation."""
+    from mlflow import MlflowClient
+
+    return MlflowClient(tracking_uri=tracking_uri)
+
+
+def list_experiments(
+    tracking_uri: str, name: str | None = None, max_results: int = 100
+) -> dict[str, str]:
     """List available experiments using MLflow Python API.
 
     Args:
         tracking_uri: MLflow tracking URI
+        name: Only return the experiment with this exact name (filtered server-side)
         max_results: Maximum number of experiments to return
 
     Returns:
-        List of dicts with 'id' and 'name' keys
+        Dict mapping experiment name to experiment ID, in search order
     """
     try:
-        import mlflow
+        filter_string = None
+        if name is not None:
+            # MLflow filter strings accept either quote style for values
+            quote = '"' if "'" in name else "'"
+            filter_string = f"name = {quote}{name}{quote}"
+
+        experiments = _get_client(tracking_uri).search_experiments(
+            max_results=max_results, filter_string=filter_string
+        )
+
+        return {exp.name: exp.experiment_id for exp in experiments}
+    except Exception as e:
+        print(f"✗ Error listing experiments: {e}")
+        return {}
+
+
+def _find_by_name(tracking_uri: str, name: str) -> str | None:
+    """Look up a single experiment ID by exact name.
 
-        mlflow.set_tracking_uri(tracking_uri)
-        experiments = mlflow.search_experiments(max_results=max_results)
+    Uses one filtered query, except for names containing both quote characters
+    (which no filter string can express): those page through all experiments
+    and match client-side.
+    """
+    if "'" not in name or '"' not in name:
+        return list_experiments(tracking_uri, name=name, max_results=1).get(name)
 
-        return [{"id": exp.experiment_id, "name": exp.name} for exp in experiments]
+    # A name containing both quote characters can't be expressed as a filter
+    # string, so page through all experiments and match exactly instead
+    try:
+        client = _get_client(tracking_uri)
+        page_token = None
+        while True:
+            page = client.search_experiments(max_results=1000, page_token=page_token)
+            for exp in page:
+                if exp.name == name:
+                    return exp.experiment_id
+            page_token = page.token
+            if not page_token:
+                return None
     except Exception as e:
         print(f"✗ Error listing experiments: {e}")
-        return []
+        return None
 
 
 def create_experiment(tracking_uri: str, name: str) -> str | None:
@@ -169,10 +282,7 @@ def create_experiment(tracking_uri: str, name: str) -> str | None:
         Experiment ID if created successfully, None otherwise
     """
     try:
-        import mlflow
-
-        mlflow.set_tracking_uri(tracking_uri)
-        exp_id = mlflow.create_experiment(name)
+        exp_id = _get_client(tracking_uri).create_experiment(name)
         return str(exp_id)
     except Exception as e:
         print(f"✗ Error creating experiment: {e}")
@@ -222,22 +332,20 @@ def configure_experiment_id(
             return exp_id
         else:
             # Try to find it by name (might have been created but ID not parsed)
-            experiments = list_experiments(tracking_uri)
-            for exp in experiments:
-                if exp["name"] == args_exp_name:
-                    print(f"✓ Found experiment ID: {exp['id']}")
-                    return exp["id"]
+            exp_id = _find_by_name(tracking_uri, args_exp_name)
+            if exp_id:
+                print(f"✓ Found experiment ID: {exp_id}")
+                return exp_id
             print(f"✗ Failed to create or find experiment '{args_exp_name}'")
             sys.exit(1)
 
     # Priority 4: Search for experiment by name if provided
     if args_exp_name:
         print(f"Searching for experiment: {args_exp_name}")
-        experiments = list_experiments(tracking_uri)
-        for exp in experiments:
-            if exp["name"] == args_exp_name:
-                print(f"✓ Found experiment ID: {exp['id']}")
-                return exp["id"]
+        exp_id = _find_by_name(tracking_uri, args_exp_name)
+        if exp_id:
+            print(f"✓ Found experiment ID: {exp_id}")
+            return exp_id
 
         # Not found - fail with clear message
         print(f"✗ Experiment '{args_exp_name}' not found")
@@ -246,15 +354,16 @@ def configure_experiment_id(
 
     # Priority 5: Auto-select first available experiment
     print("Auto-detecting experiment...")
-    experiments = list_experiments(tracking_uri)
+    # Only the first experiment is used; fetch one more to know whether others exist
+    experiments = list_experiments(tracking_uri, max_results=2)
 
     if experiments:
         # Use first experiment
-        exp = experiments[0]
-        print(f"✓ Auto-selected experiment: {exp['name']} (ID: {exp['id']})")
+        exp_name, exp_id = next(iter(experiments.items()))
+        print(f"✓ Auto-selected experiment: {exp_name} (ID: {exp_id})")
         if len(experiments) > 1:
-            print(f"  ({len(experiments) - 1} other experiment(s) available)")
-        return exp["id"]
+            print("  (more experiments available - pass --experiment-name to select one)")
+        return exp_id
 
     # No experiments found - fail with clear message
     print("✗ No experiments found")
@@ -262,41 +371,78 @@ def configure_experiment_id(
     sys.exit(1)
 
 
+def emit_config(tracking_uri: str, experiment_id: str, emit: str, env_file: str | None) -> None:
+    """Write the resolved configuration in the requested format.
+
+    Args:
+        tracking_uri: Resolved MLflow tracking URI
+        experiment_id: Resolved MLflow experiment ID
+        emit: One of "shell", "json" or "dotenv"
+        env_file: Target file for "dotenv" (resolved by parse_arguments)
+    """
+    values = {"MLFLOW_TRACKING_URI": tracking_uri, "MLFLOW_EXPERIMENT_ID": experiment_id}
+
+    if emit == "json":
+        json.dump(values, sys.stdout)
+        print()
+        return
+
+    if emit == "dotenv":
+        with open(env_file, "a") as f:
+            for key, value in values.items():
+                f.write(f"{key}={value}\n")
+        print(f"✓ Wrote MLFLOW_TRACKING_URI and MLFLOW_EXPERIMENT_ID to {env_file}")
+        return
+
+    print("Export these environment variables:")
+    print()
+    for key, value in values.items():
+        print(f'export {key}="{value}"')
+    print()
+    print("Or add them to your shell configuration (~/.bashrc, ~/.zshrc, etc.)")
+
+
 def main():
     """Main setup flow with auto-detection."""
     # Parse command-line arguments
     args = parse_arguments()
 
-    print("=" * 60)
-    print("MLflow Environment Setup for Agent Evaluation")
-    print("=" * 60)
+    # With --emit json, stdout carries only the JSON object; progress goes to stderr
+    progress_out = sys.stderr if args.emit == "json" else sys.stdout
+    with contextlib.redirect_stdout(progress_out):
+        print("=" * 60)
+        print("MLflow Environment Setup for Agent Evaluation")
+        print("=" * 60)
 
-    # Check MLflow installation
-    if not check_mlflow_installed():
-        sys.exit(1)
+        # Check MLflow installation (not needed when both values are given explicitly,
+        # since no MLflow API call is made in that case)
+        if not (args.tracking_uri and args.experiment_id):
+            if not check_mlflow_installed():
+                sys.exit(1)
 
-    print()
+            print()
 
-    # Configure tracking URI (auto-detects if not provided)
-    tracking_uri = configure_tracking_uri(args.tracking_uri)
+        # Configure tracking URI (auto-detects if not provided)
+        tracking_uri = configure_tracking_uri(args.tracking_uri)
 
-    # Configure experiment ID (auto-detects if not provided)
-    experiment_id = configure_experiment_id(
-        tracking_uri, args.experiment_id, args.experiment_name, args.create
-    )
+        # Configure experiment ID (auto-detects if not provided)
+        experiment_id = configure_experiment_id(
+            tracking_uri, args.experiment_id, args.experiment_name, args.create
+        )
 
-    # Summary
-    print("\n" + "=" * 60)
-    print("Setup Complete!")
-    print("=" * 60)
-    print()
-    print("Export these environment variables:")
-    print()
-    print(f'export MLFLOW_TRACKING_URI="{tracking_uri}"')
-    print(f'export MLFLOW_EXPERIMENT_ID="{experiment_id}"')
-    print()
-    print("Or add them to your shell configuration (~/.bashrc, ~/.zshrc, etc.)")
-    print("=" * 60)
+        # Make the values visible to anything run in-process after setup
+        os.environ["MLFLOW_TRACKING_URI"] = tracking_uri
+        os.environ["MLFLOW_EXPERIMENT_ID"] = experiment_id
+
+        # Summary
+        print("\n" + "=" * 60)
+        print("Setup Complete!")
+        print("=" * 60)
+        print()
+
+    emit_config(tracking_uri, experiment_id, args.emit, args.env_file)
+    if args.emit != "json":
+        print("=" * 60)
 
 
 if __name__ == "__main__":
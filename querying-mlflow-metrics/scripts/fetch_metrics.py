@@ -40,6 +40,9 @@ VALID_DIMENSIONS = {
 # Time unit multipliers (seconds)
 TIME_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
 
+# Relative time pattern: -24h, -7d, -1w, -30m
+RELATIVE_TIME_RE = re.compile(r"^-(\d+)([hdwm])$")
+
 
 def parse_time(time_str: str) -> int:
     """Parse time string to epoch milliseconds.
@@ -50,7 +53,7 @@ def parse_time(time_str: str) -> int:
         return int(datetime.now(timezone.utc).timestamp() * 1000)
 
     # Relative time: -24h, -7d, -1w, -30m
-    match = re.match(r"^-(\d+)([hdwm])$", time_str)
+    match = RELATIVE_TIME_RE.match(time_str)
     if match:
         value, unit = int(match.group(1)), match.group(2)
         offset_seconds = value * TIME_UNITS[unit]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import subprocess
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -38,6 +39,7 @@ class TestConfig:
     tracking_uri: Optional[str] = None
     test_runs_dir: Path = field(default_factory=lambda: Path("/tmp"))
     keep_workdir: bool = True
+    headless_smoke_test: bool = True
     environment: dict[str, str] = field(default_factory=dict)
 
 
@@ -47,11 +49,12 @@ class RuntimeState:
     full_project_dir: Optional[Path] = None
     experiment_id: Optional[str] = None
     log_file: Optional[Path] = None
-    mlflow_server_pid: Optional[int] = None
+    mlflow_server_proc: Optional[subprocess.Popen] = None
     use_external_server: bool = False
     cc_tracing_experiment_id: Optional[str] = None
     repo_root: Optional[Path] = None
     run_start_timestamp_ms: Optional[int] = None
+    cleaned_up: bool = False
 
 
 def load_config(yaml_path: str) -> TestConfig:
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import http.client
 import json
 import logging
 import os
+import re
 import shutil
 import signal
 import subprocess
 import sys
 import tempfile
+import threading
 import time
+import urllib.request
 from datetime import datetime
 from pathlib import Path
 
@@ -21,10 +25,17 @@ from utils import (
     run_command,
     claude_env,
     is_port_available,
+    link_or_copy,
+    tail_file,
 )
 
 log = logging.getLogger(__name__)
 
+# Startup banners printed when the server binds its socket (gunicorn / uvicorn).
+# Workers may still be loading the app at that point, so this only tells us to
+# start probing /health more often.
+_SERVER_READY_RE = re.compile(r"Listening at: http|Uvicorn running on http")
+
 
 def _is_databricks_uri(uri: str) -> bool:
     return uri == "databricks" or uri.startswith("databricks://")
@@ -33,6 +44,14 @@ def _is_databricks_uri(uri: str) -> bool:
 def check_prerequisites(config: TestConfig, state: RuntimeState) -> bool:
     log_section("Checking Prerequisites")
 
+    # Check the Claude Code CLI is available (cheap; no model call)
+    try:
+        result = run_command(["claude", "--version"], capture_output=True, timeout=10)
+        log.info(f"Claude Code CLI found: {result.stdout.strip()}")
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        log.error(f"Claude Code CLI not available: {e}")
+        return False
+
     # Check skill directories exist
     for skill_name in config.skills:
         skill_dir = state.repo_root / skill_name
@@ -73,6 +92,38 @@ def check_prerequisites(config: TestConfig, state: RuntimeState) -> bool:
     return True
 
 
+def _drain_server_output(
+    process: subprocess.Popen, log_file: Path, ready: threading.Event
+) -> None:
+    # Keep reading until EOF no matter what: once nobody drains the pipe, the
+    # server blocks as soon as the pipe buffer is full.
+    try:
+        f = open(log_file, "w")
+    except OSError:
+        f = None
+    try:
+        for line in process.stdout:
+            if f is not None:
+                try:
+                    f.write(line)
+                    f.flush()
+                except OSError:
+                    pass
+            if not ready.is_set() and _SERVER_READY_RE.search(line):
+                ready.set()
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _is_server_healthy(health_url: str) -> bool:
+    try:
+        with urllib.request.urlopen(health_url, timeout=1):
+            return True
+    except (OSError, http.client.HTTPException):
+        return False
+
+
 def start_mlflow_server(config: TestConfig, state: RuntimeState) -> bool:
     log_section("Starting Local MLflow Server")
 
@@ -90,53 +141,63 @@ def start_mlflow_server(config: TestConfig, state: RuntimeState) -> bool:
     # Start MLflow server in background with its own session so it doesn't
     # get killed by signals sent to the test runner's process group.
     log_file = state.work_dir / "mlflow-server.log"
-    with open(log_file, "w") as f:
-        process = subprocess.Popen(
-            [
-                "python",
-                "-m",
-                "mlflow",
-                "server",
-                "--host",
-                "127.0.0.1",
-                "--port",
-                str(config.mlflow_port),
-                "--backend-store-uri",
-                backend_store,
-                "--default-artifact-root",
-                artifact_root,
-            ],
-            stdout=f,
-            stderr=subprocess.STDOUT,
-            cwd=state.full_project_dir,
-            start_new_session=True,
-        )
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "mlflow",
+            "server",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(config.mlflow_port),
+            "--backend-store-uri",
+            backend_store,
+            "--default-artifact-root",
+            artifact_root,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=1,
+        text=True,
+        errors="replace",
+        cwd=state.full_project_dir,
+        start_new_session=True,
+    )
 
-    state.mlflow_server_pid = process.pid
+    state.mlflow_server_proc = process
 
-    # Wait for server to be ready
-    max_attempts = 30
-    for attempt in range(max_attempts):
-        try:
-            result = subprocess.run(
-                ["curl", "-s", f"http://127.0.0.1:{config.mlflow_port}/health"],
-                capture_output=True,
-                timeout=2,
-            )
-            if result.returncode == 0:
-                break
-        except Exception:
-            pass
+    # Drain server output into the log file for the lifetime of the server,
+    # signalling as soon as it reports that it has bound its socket.
+    ready = threading.Event()
+    drain_thread = threading.Thread(
+        target=_drain_server_output,
+        args=(process, log_file, ready),
+        daemon=True,
+    )
+    drain_thread.start()
+
+    # Wait for server to be ready (up to ~30s). Only a successful /health probe
+    # counts; until the startup banner appears we probe once a second (in case
+    # the banner format ever changes), then every 100ms.
+    health_url = f"http://127.0.0.1:{config.mlflow_port}/health"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if ready.is_set():
+            time.sleep(0.1)
+        else:
+            ready.wait(timeout=1)
+        if _is_server_healthy(health_url):
+            break
 
         # Check if process died
         if process.poll() is not None:
+            drain_thread.join(timeout=2)
             log.error("MLflow server process died")
             log.error(f"Check log: {log_file}")
             with open(log_file) as f:
                 print(f.read(), file=sys.stderr)
             return False
-
-        time.sleep(1)
     else:
         log.error("MLflow server failed to start (timeout)")
         log.error(f"Check log: {log_file}")
@@ -144,11 +205,17 @@ def start_mlflow_server(config: TestConfig, state: RuntimeState) -> bool:
             print(f.read(), file=sys.stderr)
         return False
 
-    log.info(f"MLflow server started (PID: {state.mlflow_server_pid})")
+    log.info(f"MLflow server started (PID: {process.pid})")
 
     tracking_uri = f"http://127.0.0.1:{config.mlflow_port}"
     os.environ["MLFLOW_TRACKING_URI"] = tracking_uri
     log.info(f"MLFLOW_TRACKING_URI set to: {tracking_uri}")
+
+    # The server is local, so fail fast rather than using MLflow's default
+    # retry/backoff (which can stall for many minutes on a wedged server).
+    # Values from the YAML environment or the caller take precedence.
+    os.environ.setdefault("MLFLOW_HTTP_REQUEST_MAX_RETRIES", "2")
+    os.environ.setdefault("MLFLOW_HTTP_REQUEST_TIMEOUT", "10")
     return True
 
 
@@ -175,10 +242,7 @@ def setup_infrastructure(config: TestConfig, state: RuntimeState) -> bool:
         if not start_mlflow_server(config, state):
             return False
 
-    # Create evaluation experiment
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    base_experiment_name = f"{config.name}-{timestamp}"
-
+    # Resolve the experiment name prefix once for both experiments
     if state.use_external_server and _is_databricks_uri(config.tracking_uri):
         db_profile = config.tracking_uri.replace("databricks://", "")
         cmd = ["databricks", "current-user", "me"]
@@ -188,7 +252,7 @@ def setup_infrastructure(config: TestConfig, state: RuntimeState) -> bool:
         else:
             log.info("Detecting Databricks workspace user (default profile)")
         try:
-            result = run_command(cmd)
+            result = run_command(cmd, capture_output=True)
             user_data = json.loads(result.stdout)
             db_user = user_data.get("userName", "")
         except Exception:
@@ -201,11 +265,16 @@ def setup_infrastructure(config: TestConfig, state: RuntimeState) -> bool:
             )
             return False
 
-        experiment_name = f"/Users/{db_user}/{base_experiment_name}"
-        log.info("Using Databricks workspace path for experiment")
+        name_prefix = f"/Users/{db_user}/"
+        log.info("Using Databricks workspace path for experiments")
     else:
-        experiment_name = base_experiment_name
+        name_prefix = ""
 
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    experiment_name = f"{name_prefix}{config.name}-{timestamp}"
+    cc_tracing_experiment_name = f"{name_prefix}claude-code-skill-{timestamp}"
+
+    # Create evaluation experiment
     log.info(f"Creating evaluation experiment: {experiment_name}")
 
     try:
@@ -218,13 +287,6 @@ def setup_infrastructure(config: TestConfig, state: RuntimeState) -> bool:
     os.environ["MLFLOW_EXPERIMENT_ID"] = state.experiment_id
 
     # Create Claude Code tracing experiment
-    cc_base_name = f"claude-code-skill-{timestamp}"
-    if state.use_external_server and _is_databricks_uri(config.tracking_uri):
-        user_prefix = "/".join(experiment_name.split("/")[:-1])
-        cc_tracing_experiment_name = f"{user_prefix}/{cc_base_name}"
-    else:
-        cc_tracing_experiment_name = cc_base_name
-
     log.info(
         f"Creating Claude Code tracing experiment: {cc_tracing_experiment_name}"
     )
@@ -260,16 +322,17 @@ def run_setup_script(config: TestConfig, state: RuntimeState) -> bool:
     # Merge user-defined environment from YAML config
     env.update(config.environment)
 
+    setup_log = state.work_dir / "setup.log"
     try:
         run_command(
-            ["python", str(setup_script)],
+            [sys.executable, str(setup_script)],
             cwd=state.work_dir,
             env=env,
+            log_path=setup_log,
         )
     except subprocess.CalledProcessError as e:
         log.error(f"Setup script failed: {e}")
-        if e.stderr:
-            log.error(f"stderr: {e.stderr}")
+        log.error(f"Last lines of {setup_log}:\n{tail_file(setup_log)}")
         return False
 
     if not state.full_project_dir.exists():
@@ -291,6 +354,8 @@ def install_skills(config: TestConfig, state: RuntimeState) -> bool:
     for skill_name in config.skills:
         src = state.repo_root / skill_name
         dst = skills_dir / skill_name
+        # Real copy rather than hardlinks: the agent under test may edit files
+        # in its skills dir, and that must not write through to the repo.
         shutil.copytree(src, dst)
         log.info(f"Installed skill: {skill_name} -> {dst}")
 
@@ -301,9 +366,12 @@ def setup_claude_code_tracing(config: TestConfig, state: RuntimeState) -> bool:
     log_section("Setting Up Claude Code Tracing")
 
     tracking_uri = os.environ.get("MLFLOW_TRACKING_URI", "")
+    setup_log = state.work_dir / "setup.log"
 
     try:
         cmd = [
+            sys.executable,
+            "-m",
             "mlflow",
             "autolog",
             "claude",
@@ -313,10 +381,11 @@ def setup_claude_code_tracing(config: TestConfig, state: RuntimeState) -> bool:
             "-e",
             state.cc_tracing_experiment_id,
         ]
-        run_command(cmd, cwd=state.full_project_dir)
+        run_command(cmd, cwd=state.full_project_dir, log_path=setup_log)
         log.info("MLflow autolog configured for Claude Code")
     except subprocess.CalledProcessError as e:
         log.error(f"Failed to configure Claude Code tracing: {e}")
+        log.error(f"Last lines of {setup_log}:\n{tail_file(setup_log)}")
         return False
 
     return True
@@ -369,6 +438,12 @@ def test_claude_headless(config: TestConfig, state: RuntimeState) -> bool:
 
 
 def cleanup(config: TestConfig, state: RuntimeState) -> None:
+    # Defensive guard: cleanup is only registered with atexit today, but a second
+    # call must never re-signal a server PID that may have been reused
+    if state.cleaned_up:
+        return
+    state.cleaned_up = True
+
     log_section("Cleanup")
 
     # Copy Claude session logs to work directory
@@ -379,23 +454,30 @@ def cleanup(config: TestConfig, state: RuntimeState) -> None:
         if session_dir.exists():
             dest_dir = state.work_dir / "claude-sessions"
             try:
-                shutil.copytree(session_dir, dest_dir, dirs_exist_ok=True)
+                # Claude Code has exited, so the logs are final: hardlink them
+                shutil.copytree(
+                    session_dir,
+                    dest_dir,
+                    dirs_exist_ok=True,
+                    copy_function=link_or_copy,
+                )
                 log.info(f"Claude session logs copied to: {dest_dir}")
             except Exception as e:
                 log.error(f"Failed to copy session logs: {e}")
 
     # Stop MLflow server if we started one
-    if state.mlflow_server_pid and not state.use_external_server:
-        log.info(f"Stopping MLflow server (PID: {state.mlflow_server_pid})...")
+    if state.mlflow_server_proc and not state.use_external_server:
+        proc = state.mlflow_server_proc
+        log.info(f"Stopping MLflow server (PID: {proc.pid})...")
         try:
             # Kill the entire process group since server runs in its own session
-            os.killpg(os.getpgid(state.mlflow_server_pid), signal.SIGTERM)
-            for _ in range(10):
-                try:
-                    os.kill(state.mlflow_server_pid, 0)
-                    time.sleep(0.5)
-                except OSError:
-                    break
+            pgid = os.getpgid(proc.pid)
+            os.killpg(pgid, signal.SIGTERM)
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                os.killpg(pgid, signal.SIGKILL)
+                proc.wait()
             log.info("MLflow server stopped")
         except OSError:
             pass
@@ -404,7 +486,16 @@ def cleanup(config: TestConfig, state: RuntimeState) -> None:
     if state.work_dir and state.work_dir.exists():
         if not config.keep_workdir:
             log.info(f"Removing working directory: {state.work_dir}")
-            shutil.rmtree(state.work_dir)
+            # rm -rf unlinks in a tight C loop; the work dir holds a full repo
+            # checkout (and usually a virtualenv), so this beats shutil.rmtree.
+            # To make teardown cheaper still, set test_runs_dir to a tmpfs
+            # such as /dev/shm.
+            removed = False
+            if os.name == "posix":
+                result = subprocess.run(["rm", "-rf", str(state.work_dir)], check=False)
+                removed = result.returncode == 0
+            if not removed:
+                shutil.rmtree(state.work_dir, ignore_errors=True)
         else:
             log.info(f"Keeping working directory: {state.work_dir}")
             log.info(f"  Claude Code output log: {state.log_file or 'N/A'}")
@@ -11,6 +11,7 @@ Arguments (via environment variables):
     CC_EXPERIMENT_ID: Claude Code tracing experiment ID
     MLFLOW_EXPERIMENT_ID: Evaluation experiment ID
     RUN_START_MS: Timestamp (ms) to filter traces created after run start
+    RESULTS_PATH: File to write the JSON results to
 """
 from __future__ import annotations
 
@@ -36,6 +37,13 @@ judge_paths = json.loads(os.environ["JUDGE_PATHS"])
 cc_experiment_id = os.environ["CC_EXPERIMENT_ID"]
 eval_experiment_id = os.environ["MLFLOW_EXPERIMENT_ID"]
 run_start_ms = int(os.environ["RUN_START_MS"])
+results_path = os.environ["RESULTS_PATH"]
+
+
+def write_results(data) -> None:
+    with open(results_path, "w") as f:
+        json.dump(data, f)
+
 
 # Load judges from all configured modules
 judges = []
@@ -47,7 +55,7 @@ for i, module_path in enumerate(judge_paths):
 
 log.info(f"Loaded {len(judges)} judge(s)")
 if not judges:
-    print(json.dumps({"error": "No judges returned by get_judges()"}))
+    write_results({"error": "No judges returned by get_judges()"})
     sys.exit(0)
 
 # Get traces created after the main run started.
@@ -67,7 +75,7 @@ if trace_df.empty:
     )
     log.info(f"Found {len(trace_df)} trace(s) in eval experiment")
 if trace_df.empty:
-    print(json.dumps({"error": "No traces found after run start"}))
+    write_results({"error": "No traces found after run start"})
     sys.exit(0)
 
 mlflow.set_experiment(experiment_id=cc_experiment_id)
@@ -100,4 +108,4 @@ for _, row in result_df.iterrows():
                 "pass": str(value).lower() == "yes",
             })
 
-print(json.dumps(results))
+write_results(results)
@@ -9,9 +9,25 @@ def main() -> None:
     repo_url = os.environ["REPO_URL"]
     project_dir = os.environ["PROJECT_DIR"]
 
+    # Abort a stalled fetch (< 1 KB/s for 30s) instead of hanging
+    env = {
+        **os.environ,
+        "GIT_HTTP_LOW_SPEED_LIMIT": "1000",
+        "GIT_HTTP_LOW_SPEED_TIME": "30",
+    }
     subprocess.run(
-        ["git", "clone", "--depth", "1", repo_url, project_dir],
+        [
+            "git",
+            "clone",
+            "--depth",
+            "1",
+            "--single-branch",
+            "--no-tags",
+            repo_url,
+            project_dir,
+        ],
         check=True,
+        env=env,
     )
 
 
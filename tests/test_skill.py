@@ -31,6 +31,8 @@ import time
 from datetime import datetime
 from pathlib import Path
 
+from mlflow import MlflowClient
+
 from config import (
     TestConfig,
     RuntimeState,
@@ -115,31 +117,49 @@ def verify_judges(config: TestConfig, state: RuntimeState) -> bool:
     log.info("Waiting for traces to flush...")
     time.sleep(10)
 
+    # Cheap in-process check before paying for the judge subprocess bootstrap
+    # (Python + MLflow + LiteLLM imports). Mirrors the trace filter used there.
+    try:
+        traces = MlflowClient().search_traces(
+            experiment_ids=[state.cc_tracing_experiment_id, state.experiment_id],
+            filter_string=f"trace.timestamp_ms > {state.run_start_timestamp_ms}",
+            max_results=1,
+            include_spans=False,
+        )
+    except Exception as e:
+        log.error(f"Failed to search traces: {e}")
+        return False
+    if not traces:
+        log.error("No traces found after run start")
+        return False
+
     judge_paths = [str(state.repo_root / j) for j in config.judges]
     for p in judge_paths:
         log.info(f"Loading judges from: {p}")
 
     # Run evaluation in a subprocess to avoid in-process hangs with LLM API calls.
     run_judges_script = str(Path(__file__).parent / "run_judges.py")
+    results_path = state.work_dir / "judge_results.json"
+    results_path.unlink(missing_ok=True)
     env = {
         "JUDGE_PATHS": json.dumps(judge_paths),
         "CC_EXPERIMENT_ID": state.cc_tracing_experiment_id,
         "MLFLOW_EXPERIMENT_ID": state.experiment_id,
         "RUN_START_MS": str(state.run_start_timestamp_ms),
+        "RESULTS_PATH": str(results_path),
     }
 
     try:
         result = run_command(
-            ["python", run_judges_script],
+            [sys.executable, run_judges_script],
             cwd=state.full_project_dir,
+            capture_output=True,
             check=False,
             timeout=config.verification_timeout,
             env=env,
         )
-        output = result.stdout.strip()
-        stderr_output = result.stderr.strip()
-        if stderr_output:
-            for line in stderr_output.splitlines():
+        for stream in (result.stdout, result.stderr):
+            for line in stream.strip().splitlines():
                 log.info(line)
     except subprocess.TimeoutExpired as e:
         log.error(f"Verification timed out after {config.verification_timeout} seconds")
@@ -151,15 +171,18 @@ def verify_judges(config: TestConfig, state: RuntimeState) -> bool:
         log.error(f"Verification script failed: {e}")
         return False
 
-    if not output:
-        log.error("Verification script produced no output")
+    if not results_path.exists():
+        log.error(
+            f"Verification script produced no results (exit code {result.returncode})"
+        )
         return False
 
     try:
-        data = json.loads(output)
+        with open(results_path) as f:
+            data = json.load(f)
     except json.JSONDecodeError as e:
-        log.error(f"Failed to parse verification output: {e}")
-        log.error(f"Raw output: {output}")
+        log.error(f"Failed to parse verification results: {e}")
+        log.error(f"Results file: {results_path}")
         return False
 
     # Handle error case (no judges or no traces)
@@ -249,8 +272,9 @@ def main() -> int:
         log.error("Claude Code tracing setup failed")
         return EXIT_SETUP_FAILED
 
-    # Phase 6: Test Claude Code headless mode
-    if not test_claude_headless(config, state):
+    # Phase 6: Test Claude Code headless mode (also verifies CC tracing before
+    # the long run; set headless_smoke_test: false to skip the extra startup)
+    if config.headless_smoke_test and not test_claude_headless(config, state):
         log.error("Claude Code headless mode test failed")
         return EXIT_SETUP_FAILED
 
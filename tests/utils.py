@@ -2,12 +2,19 @@ from __future__ import annotations
 
 import logging
 import os
+import shutil
 import socket
 import subprocess
+import sys
+from collections import deque
 from pathlib import Path
 from typing import Optional
 
-logging.basicConfig(format="[%(levelname)s] %(message)s", level=logging.INFO)
+# Single stdout handler so log records and the plain print() output (e.g. the
+# judge report) share one stream and stay in order.
+logging.basicConfig(
+    format="[%(levelname)s] %(message)s", level=logging.INFO, stream=sys.stdout
+)
 log = logging.getLogger(__name__)
 
 
@@ -21,14 +28,31 @@ def log_section(msg: str) -> None:
 def run_command(
     cmd: list[str],
     cwd: Optional[Path] = None,
-    capture_output: bool = True,
+    capture_output: bool = False,
     check: bool = True,
     timeout: Optional[int] = None,
     env: Optional[dict] = None,
+    log_path: Optional[Path] = None,
 ) -> subprocess.CompletedProcess:
-    merged_env = os.environ.copy()
+    # Without overrides, let the child inherit our environment directly
+    merged_env = None
     if env:
-        merged_env.update(env)
+        merged_env = {**os.environ, **env}
+
+    # Send noisy output we only need on failure to a file instead of
+    # buffering it in memory
+    if log_path is not None:
+        with open(log_path, "a") as f:
+            return subprocess.run(
+                cmd,
+                cwd=cwd,
+                stdout=f,
+                stderr=subprocess.STDOUT,
+                text=True,
+                check=check,
+                timeout=timeout,
+                env=merged_env,
+            )
 
     return subprocess.run(
         cmd,
@@ -41,6 +65,14 @@ def run_command(
     )
 
 
+def tail_file(path: Path, n: int = 50) -> str:
+    try:
+        with open(path, errors="replace") as f:
+            return "".join(deque(f, maxlen=n))
+    except OSError:
+        return ""
+
+
 def claude_env() -> dict[str, str]:
     env = os.environ.copy()
     env.pop("CLAUDECODE", None)
@@ -48,9 +80,27 @@ def claude_env() -> dict[str, str]:
 
 
 def is_port_available(port: int) -> bool:
+    # A successful connect means something is actually listening
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.5)
+        if s.connect_ex(("127.0.0.1", port)) == 0:
+            return False
+
+    # SO_REUSEADDR so a port left in TIME_WAIT by a previous run isn't
+    # reported as busy
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         try:
             s.bind(("127.0.0.1", port))
             return True
         except OSError:
             return False
+
+
+# copytree copy_function that hardlinks when possible (falls back to copy2, e.g.
+# across filesystems). Only for files that won't change: links share the inode.
+def link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)